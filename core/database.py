@@ -1,85 +1,194 @@
 """
 Database utilities for schema extraction and formatting.
 """
-import json
+import mmap
 import re
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Optional
+import orjson
 from loguru import logger
 
+_CREATE_TABLE_RE = re.compile(r'CREATE\s+TABLE\s+(\w+)\s*\((.*?)\);', re.IGNORECASE | re.DOTALL)
+# Bytes variant for scanning memory-mapped .sql files (stdlib re accepts any buffer).
+# Bytes \w is ASCII-only, so non-ASCII UTF-8 bytes are accepted in the table name
+# to match the same tables as the str pattern (e.g. "tábua").
+_CREATE_TABLE_BYTES_RE = re.compile(
+    rb'CREATE\s+TABLE\s+((?:\w|[\x80-\xff])+)\s*\((.*?)\);',
+    re.IGNORECASE | re.DOTALL
+)
+_DELIMITER_RE = re.compile(r'[(),]')
+# Leading keywords of table-level constraints other than PRIMARY/FOREIGN KEY
+_CONSTRAINT_KEYWORDS = frozenset({
+    'CONSTRAINT', 'UNIQUE', 'KEY', 'INDEX', 'CHECK', 'FULLTEXT', 'SPATIAL', 'EXCLUDE'
+})
+_PK_RE = re.compile(r'PRIMARY\s+KEY\s*\((\w+)\)', re.IGNORECASE)
+_FK_RE = re.compile(
+    r'FOREIGN\s+KEY\s*\((\w+)\)\s+REFERENCES\s+(\w+)\s*\((\w+)\)',
+    re.IGNORECASE
+)
 
-def parse_sql_schema(sql_statements: str) -> dict:
+
+@dataclass(slots=True)
+class Table:
+    """
+    Table parsed from a CREATE TABLE statement.
+    
+    Column names and types are kept as parallel lists, so formatting walks
+    two flat lists instead of a nested dictionary.
+    """
+    name: str
+    col_names: list[str] = field(default_factory=list)
+    col_types: list[str] = field(default_factory=list)
+    primary_key: Optional[str] = None
+    foreign_keys: list[str] = field(default_factory=list)
+
+
+def _split_columns(body: str) -> list[str]:
+    """
+    Split a CREATE TABLE body into column/constraint definitions.
+    
+    Commas nested inside parentheses (e.g. DECIMAL(10,2)) do not split.
+    
+    Args:
+        body: Text between the outer parentheses of a CREATE TABLE statement
+    
+    Returns:
+        List of stripped definitions
+    """
+    definitions = []
+    depth = 0
+    start = 0
+    
+    # Only visit delimiter positions; the regex engine skips everything else in C
+    for delim in _DELIMITER_RE.finditer(body):
+        ch = delim.group()
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif depth == 0:
+            i = delim.start()
+            definitions.append(body[start:i].strip())
+            start = i + 1
+    
+    definitions.append(body[start:].strip())
+    return definitions
+
+
+def _parse_primary_key(table: Table, col_def: str) -> None:
+    """Store the column of a PRIMARY KEY (...) constraint."""
+    # The dispatcher guarantees the keyword is at the start, so anchor the match
+    pk_match = _PK_RE.match(col_def)
+    if pk_match:
+        table.primary_key = pk_match.group(1)
+
+
+def _parse_foreign_key(table: Table, col_def: str) -> None:
+    """Append a FOREIGN KEY ... REFERENCES ... constraint as 'col -> table.col'."""
+    fk_match = _FK_RE.match(col_def)
+    if fk_match:
+        fk_str = f"{fk_match.group(1)} -> {fk_match.group(2)}.{fk_match.group(3)}"
+        table.foreign_keys.append(fk_str)
+
+
+def _parse_column(table: Table, col_def: str) -> None:
+    """Store a plain column definition as name and type."""
+    parts = col_def.split(None, 1)
+    # Table-level constraints such as UNIQUE (a) or CONSTRAINT ... are not columns
+    if parts and parts[0].split('(', 1)[0].upper() in _CONSTRAINT_KEYWORDS:
+        return
+    if len(parts) >= 2:
+        table.col_names.append(parts[0])
+        table.col_types.append(parts[1])
+    elif len(parts) == 1 and parts[0]:
+        table.col_names.append(parts[0])
+        table.col_types.append("VARCHAR(255)")
+
+
+# Dispatch on the uppercased first 11 characters of a definition
+_COLUMN_HANDLERS = {
+    'PRIMARY KEY': _parse_primary_key,
+    'FOREIGN KEY': _parse_foreign_key,
+}
+
+
+def _table_from_dict(name: str, table_info) -> Table:
+    """
+    Build a Table from the nested dictionary layout used by JSON/YAML schemas:
+    {"columns": {name: type}, "primary_key": ..., "foreign_keys": [...]}.
+    """
+    table = Table(name)
+    if isinstance(table_info, dict):
+        columns = table_info.get('columns') or {}
+        table.col_names = list(columns.keys())
+        table.col_types = list(columns.values())
+        table.primary_key = table_info.get('primary_key') or None
+        table.foreign_keys = list(table_info.get('foreign_keys') or [])
+    return table
+
+
+def _tables_from_mapping(data) -> dict[str, Table]:
+    """Convert a JSON/YAML schema mapping into Table objects."""
+    if not isinstance(data, dict):
+        raise ValueError("Schema file must map table names to table definitions")
+    return {name: _table_from_dict(name, info) for name, info in data.items()}
+
+
+def parse_sql_schema(sql_statements: str | bytes | mmap.mmap) -> dict[str, Table]:
     """
     Parse SQL CREATE TABLE statements into a schema dictionary.
     
     Args:
-        sql_statements: SQL CREATE TABLE statement(s)
+        sql_statements: SQL CREATE TABLE statement(s), either as text or as a
+            UTF-8 bytes-like object (e.g. an mmap of a .sql file)
     
     Returns:
-        Dictionary containing the parsed schema
+        Dictionary mapping table names to parsed Table objects
     """
     logger.info("Parsing SQL schema")
     
     schema = {}
     
     # Find all CREATE TABLE statements
-    create_table_pattern = r'CREATE\s+TABLE\s+(\w+)\s*\((.*?)\);'
-    matches = re.finditer(create_table_pattern, sql_statements, re.IGNORECASE | re.DOTALL)
+    is_text = isinstance(sql_statements, str)
+    if is_text:
+        matches = _CREATE_TABLE_RE.finditer(sql_statements)
+    else:
+        matches = _CREATE_TABLE_BYTES_RE.finditer(sql_statements)
     
     for match in matches:
         table_name = match.group(1)
         columns_str = match.group(2)
+        if not is_text:
+            # Only the matched spans are decoded, never the whole file
+            table_name = table_name.decode('utf-8')
+            columns_str = columns_str.decode('utf-8')
         
-        schema[table_name] = {
-            "columns": {},
-            "primary_key": None,
-            "foreign_keys": []
-        }
-        
-        # Parse columns
-        column_definitions = [col.strip() for col in columns_str.split(',')]
+        table = schema[table_name] = Table(table_name)
         
-        for col_def in column_definitions:
-            col_def = col_def.strip()
-            
-            # Check for primary key
-            if col_def.upper().startswith('PRIMARY KEY'):
-                pk_match = re.search(r'PRIMARY\s+KEY\s*\((\w+)\)', col_def, re.IGNORECASE)
-                if pk_match:
-                    schema[table_name]["primary_key"] = pk_match.group(1)
-            
-            # Check for foreign key
-            elif col_def.upper().startswith('FOREIGN KEY'):
-                fk_match = re.search(
-                    r'FOREIGN\s+KEY\s*\((\w+)\)\s+REFERENCES\s+(\w+)\s*\((\w+)\)',
-                    col_def, re.IGNORECASE
-                )
-                if fk_match:
-                    fk_str = f"{fk_match.group(1)} -> {fk_match.group(2)}.{fk_match.group(3)}"
-                    schema[table_name]["foreign_keys"].append(fk_str)
-            
-            # Parse column with name and type
-            else:
-                parts = col_def.split(None, 1)
-                if len(parts) >= 2:
-                    col_name = parts[0]
-                    col_type = parts[1]
-                    schema[table_name]["columns"][col_name] = col_type
-                elif len(parts) == 1 and parts[0]:
-                    schema[table_name]["columns"][parts[0]] = "VARCHAR(255)"
+        # Parse columns (split on top-level commas only, e.g. DECIMAL(10,2) stays intact)
+        for col_def in _split_columns(columns_str):
+            handler = _COLUMN_HANDLERS.get(col_def[:11].upper(), _parse_column)
+            handler(table, col_def)
     
     logger.info(f"Parsed schema for {len(schema)} table(s)")
     return schema
 
 
-def load_schema_from_file(file_path: str) -> dict:
+def load_schema_from_file(file_path: str) -> dict[str, Table]:
     """
     Load database schema from a JSON, YAML, or SQL file.
     
+    JSON/YAML files use the nested layout
+    {table: {"columns": {name: type}, "primary_key": ..., "foreign_keys": [...]}}
+    and are converted to Table objects, so every format returns the same type.
+    
     Args:
         file_path: Path to the schema file (JSON, YAML, or SQL)
     
     Returns:
-        Dictionary containing the schema
+        Dictionary mapping table names to Table objects
     """
     logger.info(f"Loading schema from file: {file_path}")
     
@@ -90,16 +199,21 @@ def load_schema_from_file(file_path: str) -> dict:
     
     try:
         if file_path.suffix.lower() == '.json':
-            with open(file_path, 'r') as f:
-                schema = json.load(f)
+            # orjson parses straight from bytes, skipping the decode to str
+            with open(file_path, 'rb') as f:
+                schema = _tables_from_mapping(orjson.loads(f.read()))
         elif file_path.suffix.lower() in ['.yaml', '.yml']:
             import yaml
             with open(file_path, 'r') as f:
-                schema = yaml.safe_load(f)
+                schema = _tables_from_mapping(yaml.safe_load(f))
         elif file_path.suffix.lower() == '.sql':
-            with open(file_path, 'r') as f:
-                sql_content = f.read()
-            schema = parse_sql_schema(sql_content)
+            if file_path.stat().st_size == 0:
+                # mmap cannot map an empty file
+                schema = parse_sql_schema("")
+            else:
+                with open(file_path, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    schema = parse_sql_schema(mm)
         else:
             raise ValueError(f"Unsupported file format: {file_path.suffix}")
         
@@ -116,36 +230,40 @@ def format_schema_for_prompt(schema: dict) -> str:
     Format database schema into a readable string for LLM prompts.
     
     Args:
-        schema: Dictionary containing database schema
+        schema: Dictionary mapping table names to Table objects (nested table
+            dictionaries in the JSON/YAML layout are also accepted)
     
     Returns:
         Formatted schema string
     """
     logger.info("Formatting schema for prompt")
     
-    formatted = "DATABASE SCHEMA:\n\n"
+    parts = ["DATABASE SCHEMA:\n\n"]
     
     if isinstance(schema, dict):
         for table_name, table_info in schema.items():
-            formatted += f"Table: {table_name}\n"
+            parts.append(f"Table: {table_name}\n")
+            
+            if not isinstance(table_info, Table):
+                table_info = _table_from_dict(table_name, table_info)
+            
+            if table_info.col_names:
+                parts.append("Columns:\n")
+                parts.extend(
+                    f"  - {col_name}: {col_type}\n"
+                    for col_name, col_type in zip(table_info.col_names, table_info.col_types)
+                )
+            
+            if table_info.primary_key:
+                parts.append(f"Primary Key: {table_info.primary_key}\n")
             
-            if isinstance(table_info, dict):
-                if 'columns' in table_info:
-                    formatted += "Columns:\n"
-                    for col_name, col_type in table_info['columns'].items():
-                        formatted += f"  - {col_name}: {col_type}\n"
-                
-                if 'primary_key' in table_info and table_info['primary_key']:
-                    formatted += f"Primary Key: {table_info['primary_key']}\n"
-                
-                if 'foreign_keys' in table_info and table_info['foreign_keys']:
-                    formatted += "Foreign Keys:\n"
-                    for fk in table_info['foreign_keys']:
-                        formatted += f"  - {fk}\n"
+            if table_info.foreign_keys:
+                parts.append("Foreign Keys:\n")
+                parts.extend(f"  - {fk}\n" for fk in table_info.foreign_keys)
             
-            formatted += "\n"
+            parts.append("\n")
     
-    return formatted
+    return "".join(parts)
 
 
 def validate_schema(schema: dict) -> bool:
@@ -1,6 +1,7 @@
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from endpoints.init import api_router
 
@@ -8,6 +9,7 @@ app = FastAPI(
     title="Projeto TAES - SQL Generator",
     version="1.0.0",
     swagger_ui_parameters={"displayRequestDuration": True},
+    default_response_class=ORJSONResponse,  # orjson: faster JSON encoding of responses
 )
 
 # Enable CORS for frontend communication
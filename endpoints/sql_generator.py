@@ -1,15 +1,15 @@
+import asyncio
 from fastapi import APIRouter
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from loguru import logger
-from experiments.question_rewriting import (
-    generate_sql_from_question,
-    generate_sql_with_rewriting,
-    load_schema_and_content_from_file,
-)
 
 router = APIRouter()
 
+# Limits for /generate-sql-batch: items per request and in-flight pipelines per request
+MAX_BATCH_ITEMS = 50
+BATCH_CONCURRENCY = 5
+
 
 class PromptPayload(BaseModel):
     """Request body for SQL generation with required schema and optional db_content"""
@@ -24,11 +24,27 @@ class PromptPayloadWithFile(BaseModel):
     schema_file_path: str  # File containing both schema and records - REQUIRED
 
 
+class BatchPayload(BaseModel):
+    """Request body for batch SQL generation (one result per item, same order)"""
+    items: list[PromptPayload] = Field(max_length=MAX_BATCH_ITEMS)
+
+
+def _question_rewriting():
+    """
+    Import the question rewriting pipeline on first use.
+    
+    Keeps openai and the settings load out of server startup; callers invoke it
+    inside their try block so import/config errors follow the {"error": ...} contract.
+    """
+    from experiments import question_rewriting
+    return question_rewriting
+
+
 @router.post("/generate-sql", tags=["Projeto TAES"])
-def generate_sql(payload: PromptPayload):
+async def generate_sql(payload: PromptPayload):
     """
     Generate SQL from a user prompt and required schema.
-    Uses question rewriting methodology from DART-SQL.
+    Uses DART-SQL question rewriting unless the prompt already names schema tables/columns.
     
     Args:
         payload: PromptPayload containing:
@@ -42,12 +58,14 @@ def generate_sql(payload: PromptPayload):
     logger.info(f"Generating SQL with prompt: {payload.prompt}")
     
     try:
+        pipeline = _question_rewriting()
         db_schema = payload.schema.strip()
         db_content = payload.db_content or ""
-        result = generate_sql_with_rewriting(
+        result = await pipeline.generate_sql_with_rewriting_async(
             question=payload.prompt,
             db_schema=db_schema,
-            db_content=db_content
+            db_content=db_content,
+            skip_if_specific=True
         )
         return {"SQL": result["generated_sql"]}
     except Exception as e:
@@ -56,10 +74,12 @@ def generate_sql(payload: PromptPayload):
 
 
 @router.post("/generate-sql-with-file", tags=["Projeto TAES"])
-def generate_sql_with_file(payload: PromptPayloadWithFile):
+async def generate_sql_with_file(payload: PromptPayloadWithFile):
     """
     Generate SQL from a user prompt and required schema file.
     
+    Uses DART-SQL question rewriting unless the prompt already names schema tables/columns.
+    
     The schema file should contain both the database schema and sample records.
     Format the file as JSON with "schema" and "records" keys.
     
@@ -80,15 +100,71 @@ def generate_sql_with_file(payload: PromptPayloadWithFile):
     logger.info(f"Generating SQL with file: {payload.schema_file_path}")
     
     try:
-        # Load both schema and content from the file (required)
-        db_schema, db_content = load_schema_and_content_from_file(payload.schema_file_path)
+        pipeline = _question_rewriting()
+        
+        # Load both schema and content from the file (required), off the event loop
+        db_schema, db_content = await asyncio.to_thread(
+            pipeline.load_schema_and_content_from_file, payload.schema_file_path
+        )
         
-        result = generate_sql_with_rewriting(
+        result = await pipeline.generate_sql_with_rewriting_async(
             question=payload.prompt,
             db_schema=db_schema,
-            db_content=db_content
+            db_content=db_content,
+            skip_if_specific=True
         )
         return {"SQL": result["generated_sql"]}
     except Exception as e:
         logger.error(f"Error generating SQL: {e}")
         return {"error": str(e)}
+
+
+@router.post("/generate-sql-batch", tags=["Projeto TAES"])
+async def generate_sql_batch(payload: BatchPayload):
+    """
+    Generate SQL for several prompts in a single request (same rules as /generate-sql).
+    
+    Items are processed concurrently (at most BATCH_CONCURRENCY at a time),
+    so the total latency is far below the sum of all of them. A batch holds
+    at most MAX_BATCH_ITEMS items.
+    
+    Args:
+        payload: BatchPayload containing:
+            - items: List of PromptPayload (prompt, schema, optional db_content)
+    
+    Returns:
+        Dictionary with one result per item, in the original order
+    """
+    logger.info(f"Generating SQL for batch of {len(payload.items)} prompt(s)")
+    
+    try:
+        pipeline = _question_rewriting()
+    except Exception as e:
+        logger.error(f"Error generating SQL: {e}")
+        return {"error": str(e)}
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def run(item: PromptPayload) -> dict:
+        async with semaphore:
+            return await pipeline.generate_sql_with_rewriting_async(
+                question=item.prompt,
+                db_schema=item.schema.strip(),
+                db_content=item.db_content or "",
+                skip_if_specific=True
+            )
+    
+    results = await asyncio.gather(
+        *(run(item) for item in payload.items),
+        return_exceptions=True
+    )
+    
+    response = []
+    for result in results:
+        # BaseException also covers CancelledError, which is not an Exception
+        if isinstance(result, BaseException):
+            logger.error(f"Error generating SQL: {result!r}")
+            response.append({"error": str(result) or type(result).__name__})
+        else:
+            response.append({"SQL": result["generated_sql"]})
+    return {"results": response}
@@ -1,15 +1,43 @@
 """Question Rewriting seguindo metodologia DART-SQL"""
 from loguru import logger
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from pathlib import Path
+from functools import lru_cache
+import hashlib
 import json
+import orjson
+import re
 from core.config import settings
+from core.database import parse_sql_schema
 
-client = OpenAI(api_key=settings.PROJETO_TAES_OPENAI_API_KEY)
+# Clientes criados na primeira chamada, e não no import do módulo
+@lru_cache(maxsize=1)
+def _get_client() -> OpenAI:
+    return OpenAI(api_key=settings.PROJETO_TAES_OPENAI_API_KEY)
+
+# Cliente assíncrono usado pelos endpoints (não bloqueia o event loop)
+@lru_cache(maxsize=1)
+def _get_async_client() -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=settings.PROJETO_TAES_OPENAI_API_KEY)
 
 # Modelo usado no experimento
 MODEL = "gpt-5-nano"
 
+# Mínimo de identificadores do schema citados na questão para pular o rewriting
+MIN_SCHEMA_OVERLAP = 2
+
+_WORD_RE = re.compile(r'\w+')
+
+# Prompt Zero-Shot padrão (similar ao DAIL-SQL sem exemplos)
+SQL_SYSTEM_PROMPT = """You are a SQL expert. Generate a SQL query based on the question and database schema provided.
+
+Rules:
+- Return ONLY the SQL query, no explanations or translations
+- The question may be in Portuguese or English - generate SQL regardless
+- Use proper SQL syntax
+- Follow the schema exactly as provided
+- Do NOT translate or explain the question, just generate the SQL"""
+
 def build_rewriting_prompt(question: str, db_content: str) -> str:
     """
     Prompt SIMPLIFICADO para teste - GPT-5 nano parece ter problemas com prompts longos
@@ -24,6 +52,65 @@ Original question: {question}
 
 Rewritten question (in English, only the question without explanations):"""
 
+@lru_cache(maxsize=128)
+def _schema_vocabulary(db_schema: str) -> frozenset:
+    """Nomes de tabelas e colunas (minúsculos) presentes nos CREATE TABLE do schema"""
+    vocabulary = set()
+    for table in parse_sql_schema(db_schema).values():
+        vocabulary.add(table.name.lower())
+        vocabulary.update(col_name.lower() for col_name in table.col_names)
+    return frozenset(vocabulary)
+
+def is_question_specific(question: str, db_schema: str) -> bool:
+    """
+    Verifica se a questão já cita tabelas/colunas do schema o suficiente
+    para dispensar o rewriting (pelo menos MIN_SCHEMA_OVERLAP identificadores).
+    """
+    tokens = set(_WORD_RE.findall(question.lower()))
+    return len(tokens & _schema_vocabulary(db_schema)) >= MIN_SCHEMA_OVERLAP
+
+def _prompt_cache_key(prefix: str) -> str:
+    """
+    Chave de prompt caching da OpenAI para um prefixo (schema ou registros).
+    Requisições com o mesmo prefixo são roteadas para o mesmo cache,
+    reduzindo latência e custo dos tokens repetidos.
+    """
+    return hashlib.blake2b(prefix.encode('utf-8'), digest_size=16).hexdigest()
+
+def _rewriting_messages(question: str, db_content: str) -> list[dict]:
+    """Monta as mensagens enviadas ao LLM para reescrever a questão"""
+    prompt = build_rewriting_prompt(question, db_content)
+    
+    # DEBUG: Verificar tamanho do prompt
+    logger.debug(f"📏 Tamanho do prompt: {len(prompt)} caracteres")
+    logger.debug(f"📏 Primeiros 2000 chars: {prompt[:2000]}")
+    
+    return [
+        {"role": "user", "content": prompt}
+    ]
+
+def _parse_rewritten(response, question: str) -> str:
+    """Extrai a questão reescrita da resposta do LLM (fallback: questão original)"""
+    rewritten = response.choices[0].message.content.strip()
+    
+    # Limpar prefixos comuns que o modelo pode adicionar
+    prefixes = ["Pergunta reescrita:", "Reescrita:", "Resposta:"]
+    for prefix in prefixes:
+        if rewritten.startswith(prefix):
+            rewritten = rewritten[len(prefix):].strip()
+    
+    # DEBUG: Log completo da resposta
+    logger.debug(f"Resposta do modelo (completa): '{rewritten}'")
+    logger.debug(f"Tamanho da resposta: {len(rewritten)} caracteres")
+    logger.debug(f"Finish reason: {response.choices[0].finish_reason}")
+    
+    if not rewritten:
+        logger.warning("⚠️ Modelo retornou string vazia! Usando questão original.")
+        return question
+    
+    logger.info(f"Reescrita: {rewritten}")
+    return rewritten
+
 def rewrite_question(question: str, db_content: str = "") -> str:
     """
     Reescreve pergunta usando LLM com conteúdo do banco.
@@ -37,46 +124,77 @@ def rewrite_question(question: str, db_content: str = "") -> str:
     """
     logger.info(f"Reescrevendo: {question}")
     
-    prompt = build_rewriting_prompt(question, db_content)
-    
-    # DEBUG: Verificar tamanho do prompt
-    logger.debug(f"📏 Tamanho do prompt: {len(prompt)} caracteres")
-    logger.debug(f"📏 Primeiros 2000 chars: {prompt[:2000]}")
-    
     try:
-        response = client.chat.completions.create(
+        response = _get_client().chat.completions.create(
             model=MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
+            messages=_rewriting_messages(question, db_content),
+            prompt_cache_key=_prompt_cache_key(db_content),
             max_completion_tokens=2000  # Aumentado de 500 para 2000
         )
+        return _parse_rewritten(response, question)
         
-        rewritten = response.choices[0].message.content.strip()
-        
-        # Limpar prefixos comuns que o modelo pode adicionar
-        prefixes = ["Pergunta reescrita:", "Reescrita:", "Resposta:"]
-        for prefix in prefixes:
-            if rewritten.startswith(prefix):
-                rewritten = rewritten[len(prefix):].strip()
-        
-        # DEBUG: Log completo da resposta
-        logger.debug(f"Resposta do modelo (completa): '{rewritten}'")
-        logger.debug(f"Tamanho da resposta: {len(rewritten)} caracteres")
-        logger.debug(f"Finish reason: {response.choices[0].finish_reason}")
-        
-        if not rewritten:
-            logger.warning("⚠️ Modelo retornou string vazia! Usando questão original.")
-            return question
-        
-        logger.info(f"Reescrita: {rewritten}")
-        return rewritten
+    except Exception as e:
+        logger.error(f"Erro ao reescrever: {e}")
+        # Fallback: retorna original
+        return question
+
+async def rewrite_question_async(question: str, db_content: str = "") -> str:
+    """Versão assíncrona de rewrite_question (usa o AsyncOpenAI)"""
+    logger.info(f"Reescrevendo: {question}")
+    
+    try:
+        response = await _get_async_client().chat.completions.create(
+            model=MODEL,
+            messages=_rewriting_messages(question, db_content),
+            prompt_cache_key=_prompt_cache_key(db_content),
+            max_completion_tokens=2000
+        )
+        return _parse_rewritten(response, question)
         
     except Exception as e:
         logger.error(f"Erro ao reescrever: {e}")
         # Fallback: retorna original
         return question
 
+def _sql_generation_messages(question: str, db_schema: str) -> list[dict]:
+    """
+    Monta as mensagens do prompt Zero-Shot de geração de SQL.
+    O schema vem antes da questão para que o prefixo seja idêntico entre
+    requisições do mesmo banco (elegível ao prompt caching da OpenAI).
+    """
+    user_prompt = f"""### Database Schema:
+{db_schema}
+
+### Question:
+{question}
+
+### SQL Query:"""
+
+    return [
+        {"role": "system", "content": SQL_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _parse_sql(response, question: str) -> str:
+    """Extrai a query SQL da resposta do LLM, removendo markdown"""
+    sql = response.choices[0].message.content.strip()
+    
+    # DEBUG: Log resposta antes de processar
+    logger.debug(f"SQL bruto recebido: '{sql[:200]}'")
+    logger.debug(f"Finish reason: {response.choices[0].finish_reason}")
+    
+    # Remove markdown se presente
+    if sql.startswith("```"):
+        lines = sql.split("\n")
+        sql = "\n".join(lines[1:-1]) if len(lines) > 2 else sql
+        sql = sql.replace("```sql", "").replace("```", "").strip()
+    
+    if not sql:
+        logger.warning(f"⚠️ SQL vazio após processar! Questão era: {question[:100]}")
+    
+    logger.info(f"SQL gerado: {sql[:100]}...")
+    return sql
+
 def generate_sql_from_question(question: str, db_schema: str) -> str:
     """
     Gera SQL a partir da pergunta (original ou reescrita) + schema.
@@ -91,51 +209,31 @@ def generate_sql_from_question(question: str, db_schema: str) -> str:
     """
     logger.info(f"Gerando SQL para: {question}")
     
-    # Prompt Zero-Shot padrão (similar ao DAIL-SQL sem exemplos)
-    system_prompt = """You are a SQL expert. Generate a SQL query based on the question and database schema provided.
-
-Rules:
-- Return ONLY the SQL query, no explanations or translations
-- The question may be in Portuguese or English - generate SQL regardless
-- Use proper SQL syntax
-- Follow the schema exactly as provided
-- Do NOT translate or explain the question, just generate the SQL"""
-
-    user_prompt = f"""### Database Schema:
-{db_schema}
-
-### Question:
-{question}
-
-### SQL Query:"""
-
     try:
-        response = client.chat.completions.create(
+        response = _get_client().chat.completions.create(
             model=MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=_sql_generation_messages(question, db_schema),
+            prompt_cache_key=_prompt_cache_key(db_schema),
             max_completion_tokens=2000  # Aumentado de 500 para 2000
         )
+        return _parse_sql(response, question)
         
-        sql = response.choices[0].message.content.strip()
-        
-        # DEBUG: Log resposta antes de processar
-        logger.debug(f"SQL bruto recebido: '{sql[:200]}'")
-        logger.debug(f"Finish reason: {response.choices[0].finish_reason}")
-        
-        # Remove markdown se presente
-        if sql.startswith("```"):
-            lines = sql.split("\n")
-            sql = "\n".join(lines[1:-1]) if len(lines) > 2 else sql
-            sql = sql.replace("```sql", "").replace("```", "").strip()
-        
-        if not sql:
-            logger.warning(f"⚠️ SQL vazio após processar! Questão era: {question[:100]}")
-        
-        logger.info(f"SQL gerado: {sql[:100]}...")
-        return sql
+    except Exception as e:
+        logger.error(f"Erro ao gerar SQL: {e}")
+        raise
+
+async def generate_sql_from_question_async(question: str, db_schema: str) -> str:
+    """Versão assíncrona de generate_sql_from_question (usa o AsyncOpenAI)"""
+    logger.info(f"Gerando SQL para: {question}")
+    
+    try:
+        response = await _get_async_client().chat.completions.create(
+            model=MODEL,
+            messages=_sql_generation_messages(question, db_schema),
+            prompt_cache_key=_prompt_cache_key(db_schema),
+            max_completion_tokens=2000
+        )
+        return _parse_sql(response, question)
         
     except Exception as e:
         logger.error(f"Erro ao gerar SQL: {e}")
@@ -162,6 +260,38 @@ def generate_sql_with_rewriting(question: str, db_schema: str, db_content: str)
         "generated_sql": sql
     }
 
+async def generate_sql_with_rewriting_async(
+    question: str,
+    db_schema: str,
+    db_content: str,
+    skip_if_specific: bool = False
+) -> dict:
+    """
+    Versão assíncrona do pipeline RW-Enhanced Zero-Shot.
+    As duas etapas continuam sequenciais (a geração depende da reescrita),
+    mas o event loop fica livre enquanto o LLM responde.
+    
+    Args:
+        skip_if_specific: Se True, pula o rewriting (uma chamada ao LLM a menos)
+            quando a questão já cita tabelas/colunas do schema. Desligado por
+            padrão para não alterar o Baseline 2 do experimento.
+    
+    Returns:
+        Dict com questão original, reescrita e SQL gerado
+    """
+    if skip_if_specific and is_question_specific(question, db_schema):
+        logger.info("Questão já cita o schema, pulando rewriting")
+        rewritten_question = question
+    else:
+        rewritten_question = await rewrite_question_async(question, db_content)
+    sql = await generate_sql_from_question_async(rewritten_question, db_schema)
+    
+    return {
+        "original_question": question,
+        "rewritten_question": rewritten_question,
+        "generated_sql": sql
+    }
+
 
 def load_schema_from_file(file_path: str) -> str:
     """
@@ -211,8 +341,9 @@ def load_schema_and_content_from_file(file_path: str) -> tuple[str, str]:
         if not path.exists():
             raise FileNotFoundError(f"Schema file not found: {file_path}")
         
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # orjson.JSONDecodeError herda de json.JSONDecodeError (tratado abaixo)
+        with open(path, 'rb') as f:
+            data = orjson.loads(f.read())
         
         # Extrair schema e records do JSON
         schema = data.get("schema", "").strip()
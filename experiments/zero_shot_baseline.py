@@ -12,6 +12,14 @@ client = OpenAI(api_key=settings.PROJETO_TAES_OPENAI_API_KEY)
 # Modelo usado no experimento
 MODEL = "gpt-5-nano"
 
+# Prompt Zero-Shot padrão (similar ao usado em DART-SQL)
+ZERO_SHOT_SYSTEM_PROMPT = """You are a SQL expert. Generate a SQL query based on the question and database schema provided.
+
+Rules:
+- Return ONLY the SQL query, no explanations
+- Use proper SQL syntax
+- Follow the schema exactly as provided"""
+
 def generate_sql_zero_shot(question: str, db_schema: str) -> dict:
     """
     Baseline Zero-Shot: Gera SQL da questão original + schema.
@@ -30,14 +38,6 @@ def generate_sql_zero_shot(question: str, db_schema: str) -> dict:
     """
     logger.info(f"Zero-Shot para: {question}")
     
-    # Prompt Zero-Shot padrão (similar ao usado em DART-SQL)
-    system_prompt = """You are a SQL expert. Generate a SQL query based on the question and database schema provided.
-
-Rules:
-- Return ONLY the SQL query, no explanations
-- Use proper SQL syntax
-- Follow the schema exactly as provided"""
-
     user_prompt = f"""### Database Schema:
 {db_schema}
 
@@ -50,7 +50,7 @@ Rules:
         response = client.chat.completions.create(
             model=MODEL,
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": ZERO_SHOT_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
             max_completion_tokens=500